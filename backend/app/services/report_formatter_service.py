@@ -8,6 +8,9 @@ import os
 import re
 import json
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, Any, List, Optional, Union, Tuple, TYPE_CHECKING
 from datetime import datetime
 from pathlib import Path
@@ -58,9 +61,61 @@ try:
     from weasyprint import HTML, CSS
     from weasyprint.text.fonts import FontConfiguration
     WEASYPRINT_AVAILABLE = True
-except ImportError:
+except (ImportError, OSError):
+    # weasyprint缺少pango等系统库时抛OSError而非ImportError
     WEASYPRINT_AVAILABLE = False
-    logger.warning("未安装weasyprint库，PDF功能将不可用")
+    logger.warning("未安装weasyprint库或其系统依赖，PDF功能将不可用")
+
+
+# 章节数达到该阈值时，DOCX渲染改为多进程并行
+_PARALLEL_SECTION_THRESHOLD = 8
+
+# 标题行的单遍扫描模式，代替逐行逐字符的Python循环
+_HEADER_RE = re.compile(r"^(#+)\s*(.*)$", re.MULTILINE)
+_HEADER_LINE_RE = re.compile(r"^(#{1,6})\s+(.+)$", re.MULTILINE)
+_ANCHOR_INVALID_RE = re.compile(r"[^a-z0-9-]")
+
+# [TOC]标记检测：只认行首的标记，避免对正文的全文包含扫描
+_TOC_MARK_RE = re.compile(r"^\[TOC\]", re.MULTILINE)
+
+# 常量字符串预生成，避免在循环中反复分配
+_HR_LINE = "_" * 40
+_INDENTS = tuple("  " * i for i in range(10))
+
+# 惰性行迭代模式，代替content.split('\n')一次性物化所有行
+_LINE_RE = re.compile(r"([^\n]*)\n?")
+
+
+def _iter_lines(content: str):
+    """惰性遍历文本行，等价于content.split('\\n')但不物化整个行列表"""
+    for match in _LINE_RE.finditer(content):
+        if match.group(1) or match.end() < len(content):
+            yield match.group(1)
+
+
+def _make_anchor(title: str) -> str:
+    """根据标题文本生成Markdown锚点ID"""
+    anchor = title.lower().replace(' ', '-').replace('.', '').replace(',', '')
+    return _ANCHOR_INVALID_RE.sub('', anchor)
+
+
+def _render_section_fragment(title_content: Tuple[str, str]) -> bytes:
+    """
+    在独立进程中将单个章节渲染为DOCX片段
+
+    Args:
+        title_content: (章节标题, 章节内容) 元组
+
+    Returns:
+        bytes: 片段文档的二进制内容
+    """
+    title, content = title_content
+    fragment = docx.Document()
+    fragment.add_heading(title, 1)
+    fragment.add_paragraph(content)
+    buffer = BytesIO()
+    fragment.save(buffer)
+    return buffer.getvalue()
 
 
 class CodeHighlightExtension(Extension):
@@ -77,27 +132,37 @@ class CodeBlockPreprocessor:
     def __init__(self, md):
         self.md = md
         self.pattern = re.compile(r'```(\w+)?\n(.*?)\n```', re.DOTALL)
-    
+        # 共享格式化器：nowrap避免Pygments为每个代码块各自生成包裹div
+        self.formatter = HtmlFormatter(cssclass="codehilite", nowrap=True) if PYGMENTS_AVAILABLE else None
+        # 按语言缓存lexer，同一文档中重复语言只解析一次
+        self._lexer_cache = {}
+
+    def _lexer_for(self, language: str):
+        """获取并缓存指定语言的lexer，未知语言缓存为None"""
+        if language not in self._lexer_cache:
+            try:
+                self._lexer_cache[language] = get_lexer_by_name(language, stripall=True)
+            except Exception:
+                # 如果找不到对应的语言，回退到普通代码块
+                self._lexer_cache[language] = None
+        return self._lexer_cache[language]
+
     def run(self, lines):
         text = '\n'.join(lines)
-        
+
         def replace_code_block(match):
             language = match.group(1) or 'text'
             code = match.group(2)
-            
+
             if PYGMENTS_AVAILABLE:
-                try:
-                    lexer = get_lexer_by_name(language, stripall=True)
-                    formatter = HtmlFormatter(cssclass="codehilite")
-                    result = highlight(code, lexer, formatter)
-                    return result
-                except Exception:
-                    # 如果找不到对应的语言，回退到普通代码块
-                    pass
-            
+                lexer = self._lexer_for(language)
+                if lexer is not None:
+                    highlighted = highlight(code, lexer, self.formatter)
+                    return f'<div class="codehilite"><pre>{highlighted}</pre></div>'
+
             # 回退到普通代码块
             return f'<pre><code class="language-{language}">{code}</code></pre>'
-        
+
         text = self.pattern.sub(replace_code_block, text)
         return text.split('\n')
 
@@ -121,16 +186,16 @@ class MarkdownFormatter:
             str: 格式化后的Markdown内容
         """
         result = content
-        
+
         # 添加目录（如果需要）
-        if include_toc and "[TOC]" not in result:
+        if include_toc and not _TOC_MARK_RE.search(result):
             result = f"[TOC]\n\n{result}"
-        
+
         # 添加代码高亮（如果需要）
         if include_code_highlighting:
             # 这里可以添加代码高亮的逻辑
             pass
-        
+
         return result
     
     def generate_toc(self, content: str) -> str:
@@ -143,26 +208,12 @@ class MarkdownFormatter:
         Returns:
             str: 添加目录后的Markdown内容
         """
-        # 查找所有标题
+        # 查找所有标题（单遍正则扫描，避免逐行逐字符的Python循环）
         headers = []
-        for line in content.split('\n'):
-            if line.startswith('#'):
-                # 计算标题级别
-                level = 0
-                for char in line:
-                    if char == '#':
-                        level += 1
-                    else:
-                        break
-                
-                # 提取标题文本
-                title = line[level:].strip()
-                
-                # 创建锚点ID
-                anchor = title.lower().replace(' ', '-').replace('.', '').replace(',', '')
-                anchor = re.sub(r'[^a-z0-9-]', '', anchor)
-                
-                headers.append((level, title, anchor))
+        for match in _HEADER_RE.finditer(content):
+            level = len(match.group(1))
+            title = match.group(2).strip()
+            headers.append((level, title, _make_anchor(title)))
         
         # 生成目录
         toc = "## 目录\n\n"
@@ -172,30 +223,19 @@ class MarkdownFormatter:
                 continue
             
             # 添加缩进
-            indent = "  " * (level - 1)
+            indent = _INDENTS[min(level - 1, len(_INDENTS) - 1)]
             toc += f"{indent}- [{title}](#{anchor})\n"
         
         toc += "\n"
         
         # 在内容中添加锚点
-        lines = content.split('\n')
         result = []
-        
-        for line in lines:
-            if line.startswith('#'):
-                level = 0
-                for char in line:
-                    if char == '#':
-                        level += 1
-                    else:
-                        break
-                
-                title = line[level:].strip()
-                anchor = title.lower().replace(' ', '-').replace('.', '').replace(',', '')
-                anchor = re.sub(r'[^a-z0-9-]', '', anchor)
-                
-                result.append(f'<a id="{anchor}"></a>')
-            
+
+        for line in _iter_lines(content):
+            match = _HEADER_RE.match(line)
+            if match:
+                result.append(f'<a id="{_make_anchor(match.group(2).strip())}"></a>')
+
             result.append(line)
         
         # 在第一个标题之后插入目录
@@ -445,14 +485,14 @@ class DocxFormatter:
         doc.add_heading("目录", 1)
         
         # 添加分隔线
-        doc.add_paragraph("_" * 40)
+        doc.add_paragraph(_HR_LINE)
         
         # 注意：python-docx不直接支持自动生成目录
         # 这里只是添加一个占位符
         doc.add_paragraph("目录将在此处生成")
         
         # 添加分隔线
-        doc.add_paragraph("_" * 40)
+        doc.add_paragraph(_HR_LINE)
         doc.add_paragraph()  # 添加空行
     
     def add_code_block(self, doc, code: str, language: str = None) -> None:
@@ -548,17 +588,7 @@ class ReportFormatterService:
         Returns:
             str: 格式化后的Markdown内容
         """
-        result = content
-        
-        # 添加目录（如果需要）
-        if include_toc and "[TOC]" not in result:
-            result = f"[TOC]\n\n{result}"
-        
-        # 添加代码高亮（如果需要）
-        if include_code_highlighting:
-            result = self._add_code_highlighting(result)
-        
-        return result
+        return self.get_formatter("markdown").format(content, include_toc, include_code_highlighting)
     
     def format_docx(self, doc, template, include_toc: bool = True, include_styles: bool = True) -> None:
         """
@@ -633,30 +663,27 @@ class ReportFormatterService:
         if include_styles:
             self._add_docx_styles(doc)
         
-        # 解析Markdown内容
-        lines = markdown_content.split("\n")
-        i = 0
-        
+        # 解析Markdown内容（惰性逐行迭代，避免一次性物化所有行）
+        line_iter = _iter_lines(markdown_content)
+        line = next(line_iter, None)
+
         # 处理[TOC]标记（如果有）
-        if include_toc and i < len(lines) and lines[i].strip() == "[TOC]":
-            i += 1  # 跳过[TOC]行
+        if include_toc and line is not None and line.strip() == "[TOC]":
             # 这里可以添加目录生成逻辑
             # 由于python-docx不直接支持目录，这里可以手动生成一个简单的目录
             self._add_toc_to_docx(doc, markdown_content)
-            
-            # 跳过空行
-            while i < len(lines) and not lines[i].strip():
-                i += 1
-        
+
+            # 跳过[TOC]行之后的空行
+            line = next(line_iter, None)
+            while line is not None and not line.strip():
+                line = next(line_iter, None)
+
         # 处理文档标题和正文
-        current_paragraph = None
         in_code_block = False
         code_block_content = []
         code_language = None
-        
-        while i < len(lines):
-            line = lines[i]
-            
+
+        while line is not None:
             # 处理代码块
             if line.startswith("```"):
                 if not in_code_block:
@@ -676,41 +703,41 @@ class ReportFormatterService:
                         code_para = doc.add_paragraph()
                         code_para.style = "Code"
                         code_para.add_run("\n".join(code_block_content))
-                i += 1
+                line = next(line_iter, None)
                 continue
-            
+
             if in_code_block:
                 # 收集代码块内容
                 code_block_content.append(line)
-                i += 1
+                line = next(line_iter, None)
                 continue
-            
+
             # 处理标题
-            header_match = re.match(r"^(#{1,6})\s+(.+)$", line)
+            header_match = _HEADER_LINE_RE.match(line)
             if header_match:
                 level = len(header_match.group(1))
                 title = header_match.group(2).strip()
                 doc.add_heading(title, level)
-                i += 1
+                line = next(line_iter, None)
                 continue
-            
+
             # 处理列表项
             list_match = re.match(r"^(\s*)([-*+]|\d+\.)\s+(.+)$", line)
             if list_match:
                 indent = len(list_match.group(1))
                 list_type = list_match.group(2)
                 content = list_match.group(3).strip()
-                
+
                 # 确定列表级别和类型
                 level = indent // 2
                 is_numbered = bool(re.match(r"\d+\.", list_type))
-                
+
                 # 添加列表项
                 p = doc.add_paragraph(content)
                 p.style = f"List Bullet {level + 1}" if not is_numbered else f"List Number {level + 1}"
-                i += 1
+                line = next(line_iter, None)
                 continue
-            
+
             # 处理普通段落
             if line.strip():
                 # 处理加粗、斜体等Markdown格式
@@ -719,9 +746,9 @@ class ReportFormatterService:
             else:
                 # 空行
                 doc.add_paragraph()
-            
-            i += 1
-        
+
+            line = next(line_iter, None)
+
         # 添加图表（如果需要）
         if include_charts and chart_data:
             self._add_charts_to_docx(doc, chart_data)
@@ -740,14 +767,12 @@ class ReportFormatterService:
         # 添加目录标题
         doc.add_heading("目录", 1)
         
-        # 解析Markdown中的标题
+        # 解析Markdown中的标题（单遍正则扫描）
         headers = []
-        for line in markdown_content.split("\n"):
-            header_match = re.match(r"^(#{1,6})\s+(.+)$", line)
-            if header_match:
-                level = len(header_match.group(1))
-                title = header_match.group(2).strip()
-                headers.append((level, title))
+        for header_match in _HEADER_LINE_RE.finditer(markdown_content):
+            level = len(header_match.group(1))
+            title = header_match.group(2).strip()
+            headers.append((level, title))
         
         # 添加目录项
         for level, title in headers:
@@ -756,7 +781,7 @@ class ReportFormatterService:
                 continue
             
             # 添加目录项，根据级别缩进
-            indent = "  " * (level - 1)
+            indent = _INDENTS[min(level - 1, len(_INDENTS) - 1)]
             p = doc.add_paragraph(f"{indent}• {title}")
             p.style = "TOC"
         
@@ -929,35 +954,69 @@ class ReportFormatterService:
                 paragraph.add_run(text[i])
                 i += 1 
 
+    # format_report结果缓存：同一模板+章节+格式的重复导出直接复用
+    _format_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+    _format_cache_lock = threading.Lock()
+    _FORMAT_CACHE_MAX = 256
+
+    @classmethod
+    def clear_format_cache(cls) -> None:
+        """清空format_report的结果缓存（模板或章节更新后调用）"""
+        with cls._format_cache_lock:
+            cls._format_cache.clear()
+
     def format_report(self, template: ReportTemplate, sections: List[ReportSection], format_type: ReportFormatEnum) -> bytes:
         """
         根据指定的格式生成报告
+
+        相同的(模板, 章节, 格式)组合直接命中缓存，避免重复渲染。
         """
+        sections_sig = tuple(
+            (section.id, getattr(section, "updated_at", None), section.order, hash(section.content))
+            for section in sections
+        )
+        cache_key = (template.id, sections_sig, format_type)
+
+        with self._format_cache_lock:
+            cached = self._format_cache.get(cache_key)
+            if cached is not None:
+                self._format_cache.move_to_end(cache_key)
+                return cached
+
         if format_type == ReportFormatEnum.MARKDOWN:
-            return self._to_markdown(template, sections).encode('utf-8')
+            result = self._to_markdown(template, sections).encode('utf-8')
         elif format_type == ReportFormatEnum.DOCX:
-            return self._to_docx(template, sections)
+            result = self._to_docx(template, sections)
         else:
             raise ValueError(f"不支持的报告格式: {format_type}")
 
+        with self._format_cache_lock:
+            self._format_cache[cache_key] = result
+            while len(self._format_cache) > self._FORMAT_CACHE_MAX:
+                self._format_cache.popitem(last=False)
+
+        return result
+
     def _to_markdown(self, template: ReportTemplate, sections: List[ReportSection]) -> str:
         """
         将报告转换为Markdown格式
+
+        以列表累积片段后一次join，避免+=逐段拷贝导致的二次方开销。
         """
-        markdown_content = ""
-        
+        parts = []
+
         # 使用模板的额外信息
         if template.extra_info:
             for key, value in template.extra_info.items():
-                markdown_content += f"**{key.capitalize()}**: {value}\\n\\n"
-        
+                parts.append(f"**{key.capitalize()}**: {value}\n\n")
+
         # 添加章节
         for section in sorted(sections, key=lambda s: s.order):
-            markdown_content += f"## {section.title}\\n\\n"
-            markdown_content += section.content
-            markdown_content += "\\n\\n"
-        
-        return markdown_content
+            parts.append(f"## {section.title}\n\n")
+            parts.append(section.content)
+            parts.append("\n\n")
+
+        return "".join(parts)
 
     def _to_docx(self, template: ReportTemplate, sections: List[ReportSection]) -> bytes:
         """生成DOCX格式的报告"""
@@ -972,17 +1031,30 @@ class ReportFormatterService:
                 document.add_paragraph(f"{key.capitalize()}: {value}")
 
         # 添加章节
-        for section in sorted(sections, key=lambda s: s.order):
-            document.add_heading(section.title, 1)
-            document.add_paragraph(section.content)
-        
-        # 保存文档
-        output_path = f"{template.title.replace(' ', '_')}.docx"
-        document.save(output_path)
-        
-        # 读取文档内容
-        with open(output_path, 'rb') as f:
-            return f.read() 
+        sorted_sections = sorted(sections, key=lambda s: s.order)
+        if len(sorted_sections) >= _PARALLEL_SECTION_THRESHOLD:
+            # 章节较多时在进程池中并行渲染片段，再拼接回主文档
+            with ProcessPoolExecutor() as executor:
+                fragments = list(executor.map(
+                    _render_section_fragment,
+                    [(section.title, section.content) for section in sorted_sections]
+                ))
+            for fragment_bytes in fragments:
+                fragment = docx.Document(BytesIO(fragment_bytes))
+                for element in fragment.element.body:
+                    # 跳过片段自带的页面设置节点，避免污染主文档
+                    if element.tag.endswith('}sectPr'):
+                        continue
+                    document.element.body.append(element)
+        else:
+            for section in sorted_sections:
+                document.add_heading(section.title, 1)
+                document.add_paragraph(section.content)
+
+        # 保存到内存缓冲，避免经由磁盘临时文件再读回
+        buffer = BytesIO()
+        document.save(buffer)
+        return buffer.getvalue()
 
     def markdown_to_pdf(
         self,
@@ -1008,11 +1080,10 @@ class ReportFormatterService:
         """
         if not WEASYPRINT_AVAILABLE:
             raise ReportGenerationException("未安装weasyprint库，无法生成PDF报告")
+        if not MARKDOWN_AVAILABLE or not PYGMENTS_AVAILABLE:
+            raise ReportGenerationException("生成PDF失败：缺少必要的库 (markdown/pygments)。请确保已正确安装。")
 
         try:
-            from pygments.formatters import HtmlFormatter
-            import markdown
-
             # 1. 为代码高亮准备CSS
             formatter = HtmlFormatter(style="default", full=True, cssclass="codehilite")
             css_styles = formatter.get_style_defs()
@@ -1042,14 +1113,11 @@ class ReportFormatterService:
             </html>
             """
 
-            # 4. 使用WeasyPrint生成PDF
+            # 4. 使用WeasyPrint生成PDF（高亮CSS已内联在HTML中）
             font_config = FontConfiguration()
             html = HTML(string=full_html, base_url=".")
-            html.write_pdf(output_path, stylesheets=[css], font_config=font_config)
+            html.write_pdf(output_path, font_config=font_config)
 
-        except ImportError as e:
-            # This will catch missing pygments or markdown
-            raise ReportGenerationException(f"生成PDF失败：缺少必要的库 ({e.name})。请确保已正确安装。")
         except Exception as e:
             logger.error(f"PDF生成过程中发生未知错误: {str(e)}")
             raise ReportGenerationException(f"生成PDF时发生未知错误: {e}") 
\ No newline at end of file
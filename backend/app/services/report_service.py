@@ -7,22 +7,25 @@
 import os
 import re
 import json
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 import logging
 import hashlib
-import jinja2
-import markdown
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from enum import Enum
 from typing import List, Dict, Any, Optional, Union, Tuple
 from pathlib import Path
 from datetime import datetime
-from functools import lru_cache
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException, status
 
 from backend.app.core.config import settings
 from backend.app.core.exceptions import ReportGenerationException
 from backend.app.services.report_formatter_service import ReportFormatterService
-from backend.app.models.report import Report, ReportStatusEnum, ReportFormatEnum, ReportTemplate as ReportTemplateModel
+from backend.app.models.report import Report, ReportSection, ReportStatusEnum, ReportFormatEnum, ReportTemplate as ReportTemplateModel
 from backend.app.schemas.report import CompetitionReportCreate
 from backend.app.models.competition import Competition
 from backend.app.models.user import User
@@ -31,54 +34,193 @@ from backend.app.models.user import User
 # 配置日志
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# 已确认存在的目录集合：每个进程对同一路径只做一次mkdir检查
+_ensured_dirs: set = set()
+_ensured_dirs_lock = threading.Lock()
+
+
+def _ensure_dir(path: Path) -> Path:
+    """确保目录存在，同一路径在进程生命周期内只检查一次"""
+    key = str(path)
+    if key not in _ensured_dirs:
+        with _ensured_dirs_lock:
+            if key not in _ensured_dirs:
+                path.mkdir(parents=True, exist_ok=True)
+                _ensured_dirs.add(key)
+    return path
+
+
+# jinja2/markdown只在报告真正渲染时才需要，惰性导入让只走增删查改
+# 路径的worker不用付出这两个库的导入和常驻内存成本
+@lru_cache(maxsize=None)
+def _get_jinja_env() -> "jinja2.Environment":
+    """
+    惰性构建进程内共享的Jinja2环境
+
+    所有报告模板通过它编译；编译出的字节码落盘到报告缓存目录，
+    进程重启/多worker场景跳过重新编译。
+    """
+    import jinja2
+    try:
+        bc_cache = jinja2.FileSystemBytecodeCache(
+            str(_ensure_dir(Path(settings.REPORTS_DIR) / "cache" / "jinja_bc"))
+        )
+    except OSError:
+        bc_cache = None
+    return jinja2.Environment(bytecode_cache=bc_cache, auto_reload=False)
+
+# 模板中 {{variable}} 占位符的匹配模式，模块级编译一次
+_TEMPLATE_VAR_RE = re.compile(r"\{\{\s*([\w.]+)\s*\}\}")
+
+# Markdown转换器按线程复用：构造Markdown实例要加载扩展、编译一批正则，
+# 转换本身有内部状态不能跨线程共享，因此挂在threading.local上
+_md_converter_local = threading.local()
+
+
+def _get_md_converter() -> "markdown.Markdown":
+    """返回当前线程的预配置Markdown转换器，复用前由调用方reset()"""
+    import markdown
+    converter = getattr(_md_converter_local, "converter", None)
+    if converter is None:
+        converter = markdown.Markdown(extensions=['tables', 'fenced_code'])
+        _md_converter_local.converter = converter
+    return converter
+
+# PDF渲染用的HTML外壳：CSS是静态内容，模块级只构造一次，
+# 每次生成仅做一处{body}替换
+_HTML_WRAPPER = """
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        body { font-family: 'SimSun', sans-serif; line-height: 1.6; }
+        h1, h2, h3 { color: #333; }
+        table { border-collapse: collapse; width: 100%; }
+        th, td { border: 1px solid #ddd; padding: 8px; }
+        th { background-color: #f2f2f2; }
+        code { font-family: 'Courier New', monospace; background-color: #eee; padding: 2px 4px; border-radius: 4px; }
+        pre > code { display: block; padding: 10px; }
+    </style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+# 模板变量集合缓存：(模板ID, updated_at) -> 变量名集合，模板未改动时免去重复扫描
+_template_vars_cache: Dict[Tuple[Any, Any], frozenset] = {}
+_template_vars_lock = threading.Lock()
+
+
+def _vars_for_template(template_id: Any, version: Any, md_template_str: str) -> frozenset:
+    """返回模板markdown中引用的 {{variable}} 变量名集合，按模板版本缓存"""
+    key = (template_id, version)
+    variables = _template_vars_cache.get(key)
+    if variables is None:
+        variables = frozenset(_TEMPLATE_VAR_RE.findall(md_template_str))
+        with _template_vars_lock:
+            if len(_template_vars_cache) >= 128:
+                _template_vars_cache.clear()
+            _template_vars_cache[key] = variables
+    return variables
+
 
 class StructureSection:
     """
     报告结构中的一个部分
     """
-    
+
+    # 大模板会分配大量节点实例，__slots__省去每实例的__dict__开销
+    __slots__ = ("title", "content", "level", "subsections",
+                 "_md_cache", "_dict_cache", "_fingerprint", "_jinja_cache", "_parent")
+
     def __init__(self, title: str, content: str = "", level: int = 1):
         self.title = title
         self.content = content
         self.level = max(1, min(6, level))
         self.subsections: List['StructureSection'] = []
-    
+        self._md_cache: Optional[str] = None
+        self._dict_cache: Optional[Dict[str, Any]] = None
+        self._fingerprint: Optional[str] = None
+        self._jinja_cache = None
+        self._parent = None
+
     def add_subsection(self, subsection: 'StructureSection') -> None:
         self.subsections.append(subsection)
-    
+        subsection._parent = self
+        self._invalidate_md_cache()
+
+    def _invalidate_md_cache(self) -> None:
+        # 沿父链向上清除缓存，保证嵌套修改后祖先节点也会重新渲染
+        node = self
+        while node is not None:
+            node._md_cache = None
+            node._dict_cache = None
+            node._fingerprint = None
+            node._jinja_cache = None
+            node = node._parent
+
     def to_markdown(self) -> str:
-        md = f"{'#' * self.level} {self.title}\\n\\n"
-        if self.content:
-            md += f"{self.content}\\n\\n"
-        for subsection in self.subsections:
-            md += subsection.to_markdown()
-        return md
+        # 渲染结果按实例缓存，add_subsection会使缓存失效；
+        # 直接改写title/content等属性后需要手动置空_md_cache
+        if self._md_cache is None:
+            parts = [f"{'#' * self.level} {self.title}\n\n"]
+            if self.content:
+                parts.append(f"{self.content}\n\n")
+            parts.extend(subsection.to_markdown() for subsection in self.subsections)
+            self._md_cache = "".join(parts)
+        return self._md_cache
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "title": self.title,
-            "content": self.content,
-            "level": self.level,
-            "subsections": [subsection.to_dict() for subsection in self.subsections]
-        }
+        # 与to_markdown同样按实例缓存；调用方不应就地修改返回值
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "title": self.title,
+                "content": self.content,
+                "level": self.level,
+                "subsections": [subsection.to_dict() for subsection in self.subsections]
+            }
+        return self._dict_cache
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'StructureSection':
-        section = cls(
+        root = cls(
             title=data["title"],
             content=data.get("content", ""),
             level=data.get("level", 1)
         )
-        for subsection_data in data.get("subsections", []):
-            section.add_subsection(cls.from_dict(subsection_data))
-        return section
+        # 显式栈代替逐节点递归，宽/深模板的加载不再付出每层的调用开销
+        stack = [(root, data.get("subsections", []))]
+        while stack:
+            parent, subsections_data = stack.pop()
+            for subsection_data in subsections_data:
+                section = cls(
+                    title=subsection_data["title"],
+                    content=subsection_data.get("content", ""),
+                    level=subsection_data.get("level", 1)
+                )
+                parent.add_subsection(section)
+                stack.append((section, subsection_data.get("subsections", [])))
+        return root
 
 
 class ReportStructure:
     """
     报告的整体结构，用于构建和序列化。
     """
-    
+
+    # 与StructureSection一致，固定属性集省去每实例的__dict__开销
+    __slots__ = ("title", "description", "metadata", "sections", "version", "created_at",
+                 "_md_cache", "_dict_cache", "_fingerprint", "_jinja_cache", "_parent")
+
     def __init__(self, title: str, description: str = "", metadata: Dict[str, Any] = None):
         self.title = title
         self.description = description
@@ -86,32 +228,69 @@ class ReportStructure:
         self.sections: List[StructureSection] = []
         self.version = "1.1.0"
         self.created_at = datetime.now().isoformat()
-    
+        self._md_cache: Optional[str] = None
+        self._dict_cache: Optional[Dict[str, Any]] = None
+        self._fingerprint: Optional[str] = None
+        self._jinja_cache: Optional["jinja2.Template"] = None
+        self._parent = None
+
     def add_section(self, section: StructureSection) -> None:
         self.sections.append(section)
-    
+        section._parent = self
+        self._md_cache = None
+        self._dict_cache = None
+        self._fingerprint = None
+        self._jinja_cache = None
+
+    def fingerprint(self) -> str:
+        """
+        返回结构内容的稳定指纹
+
+        惰性计算并缓存，结构变化时随markdown缓存一起失效；
+        用于缓存键组合，避免每次重新哈希完整的模板内容。
+        """
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(self.to_markdown().encode('utf-8'), digest_size=16)
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def jinja_template(self) -> "jinja2.Template":
+        """
+        返回结构markdown对应的已编译Jinja2模板
+
+        编译结果按实例缓存，同一模板多次渲染时跳过重复的解析/编译；
+        结构变化时随markdown缓存一起失效。
+        """
+        if self._jinja_cache is None:
+            self._jinja_cache = _get_jinja_env().from_string(self.to_markdown())
+        return self._jinja_cache
+
     def to_markdown(self) -> str:
-        md = f"# {self.title}\\n\\n"
-        if self.description:
-            md += f"{self.description}\\n\\n"
-        if self.metadata:
-            md += "## 元数据\\n\\n"
-            for key, value in self.metadata.items():
-                md += f"- **{key}**: {value}\\n"
-            md += "\\n"
-        for section in self.sections:
-            md += section.to_markdown()
-        return md
+        # 同一结构反复生成报告时（缓存键计算+渲染）共享一次转换结果
+        if self._md_cache is None:
+            parts = [f"# {self.title}\n\n"]
+            if self.description:
+                parts.append(f"{self.description}\n\n")
+            if self.metadata:
+                parts.append("## 元数据\n\n")
+                parts.append("".join(f"- **{key}**: {value}\n" for key, value in self.metadata.items()))
+                parts.append("\n")
+            parts.extend(section.to_markdown() for section in self.sections)
+            self._md_cache = "".join(parts)
+        return self._md_cache
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "title": self.title,
-            "description": self.description,
-            "metadata": self.metadata,
-            "sections": [section.to_dict() for section in self.sections],
-            "version": self.version,
-            "created_at": self.created_at
-        }
+        # 序列化、指纹与缓存键共享同一份结果；调用方不应就地修改返回值
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "title": self.title,
+                "description": self.description,
+                "metadata": self.metadata,
+                "sections": [section.to_dict() for section in self.sections],
+                "version": self.version,
+                "created_at": self.created_at
+            }
+        return self._dict_cache
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ReportStructure':
@@ -138,14 +317,28 @@ class ReportStructure:
         return template
     
     def save_to_file(self, file_path: str) -> None:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
-    
+        # 优先用orjson做序列化（Rust实现，嵌套结构快一个数量级），缺失时回退stdlib
+        if ORJSON_AVAILABLE:
+            payload = orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(self.to_dict(), ensure_ascii=False, indent=2).encode("utf-8")
+        path = Path(file_path)
+
+        # 内容与磁盘一致时跳过重写，省去重复初始化场景下的无谓写盘
+        try:
+            if path.exists() and path.read_bytes() == payload:
+                return
+        except OSError:
+            pass
+
+        path.write_bytes(payload)
+
     @classmethod
     def load_from_file(cls, file_path: str) -> 'ReportStructure':
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            raw = Path(file_path).read_bytes()
+            # orjson.JSONDecodeError是json.JSONDecodeError的子类，异常处理保持一致
+            data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
             return cls.from_dict(data)
         except (FileNotFoundError, json.JSONDecodeError) as e:
             logger.error(f"加载报告结构文件失败: {file_path}, error: {e}")
@@ -160,18 +353,21 @@ def delete_report(db: Session, report_id: int, user_id: int):
         report_id: 要删除的报告ID
         user_id: 当前操作的用户ID（用于权限验证）
     """
-    db_report = db.query(Report).filter(Report.id == report_id).first()
-    if not db_report:
+    # 仅取owner_id做权限判定，不物化整个ORM对象
+    owner_id = db.query(Report.owner_id).filter(Report.id == report_id).scalar()
+    if owner_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"ID为 {report_id} 的报告未找到"
         )
-    if db_report.owner_id != user_id:
+    if owner_id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="无权删除此报告"
         )
-    db.delete(db_report)
+    # 批量DELETE不触发ORM级联，先显式删除章节再删报告
+    db.query(ReportSection).filter(ReportSection.report_id == report_id).delete(synchronize_session=False)
+    db.query(Report).filter(Report.id == report_id).delete(synchronize_session=False)
     db.commit()
 
 
@@ -207,12 +403,10 @@ class ReportService:
         self.db = db
         self.logger = logger
         self.formatter = ReportFormatterService()
-        self.reports_dir = Path(settings.REPORTS_DIR)
-        self.reports_dir.mkdir(parents=True, exist_ok=True)
-        self.templates_dir = Path(settings.REPORTS_TEMPLATES_DIR)
-        self.templates_dir.mkdir(parents=True, exist_ok=True)
-        self.cache_dir = self.reports_dir / "cache"
-        self.cache_dir.mkdir(exist_ok=True)
+        # 服务按请求频繁实例化，目录检查通过进程级缓存只执行一次
+        self.reports_dir = _ensure_dir(Path(settings.REPORTS_DIR))
+        self.templates_dir = _ensure_dir(Path(settings.REPORTS_TEMPLATES_DIR))
+        self.cache_dir = _ensure_dir(self.reports_dir / "cache")
     
     def create_competition_report(self, report_in: CompetitionReportCreate, user_id: int) -> Report:
         """为指定竞赛创建新的报告"""
@@ -248,20 +442,146 @@ class ReportService:
         """获取用户的所有报告"""
         return self.db.query(Report).filter(Report.owner_id == user_id).order_by(Report.created_at.desc()).all()
 
-    @lru_cache(maxsize=32)
+    # 缓存目录清理策略：过期（TTL）或总量超限时按访问时间从旧到新淘汰，
+    # 清理本身做了节流，不会在每次请求中扫描目录
+    _CACHE_TTL_SECONDS = 7 * 24 * 3600
+    _CACHE_MAX_BYTES = 512 * 1024 * 1024
+    _CACHE_PRUNE_INTERVAL = 3600
+    _last_cache_prune = 0.0
+
+    # 内存层缓存：cache_key -> 磁盘缓存文件路径。热点报告的重复请求
+    # 直接命中内存，不再走文件系统stat；磁盘清理时同步淘汰对应条目
+    _hit_cache: "OrderedDict[str, str]" = OrderedDict()
+    _hit_cache_lock = threading.Lock()
+    _HIT_CACHE_MAX = 256
+
+    # 渲染结果缓存：(模板指纹, 数据哈希) -> 渲染好的Markdown。
+    # 同一模板同一数据连续导出多种格式（如Markdown后再DOCX）时，
+    # 第二次起跳过整个Jinja渲染
+    _render_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+    _render_cache_lock = threading.Lock()
+    _RENDER_CACHE_MAX = 32
+
+    @classmethod
+    def _render_cache_key(cls, template: ReportStructure, data: dict) -> Tuple[str, str]:
+        """计算渲染缓存键：(模板指纹, 数据哈希)"""
+        h = hashlib.blake2b(digest_size=16)
+        cls._hash_data(h, data)
+        return (template.fingerprint(), h.hexdigest())
+
+    @classmethod
+    def _render_cache_get(cls, template: ReportStructure, data: dict) -> Optional[str]:
+        """查询已缓存的渲染结果，未命中返回None"""
+        key = cls._render_cache_key(template, data)
+        with cls._render_cache_lock:
+            if key in cls._render_cache:
+                cls._render_cache.move_to_end(key)
+                return cls._render_cache[key]
+        return None
+
+    @classmethod
+    def _render_markdown_cached(cls, template: ReportStructure, data: dict) -> str:
+        """渲染模板为Markdown，按(模板指纹, 数据哈希)记忆结果"""
+        key = cls._render_cache_key(template, data)
+
+        with cls._render_cache_lock:
+            if key in cls._render_cache:
+                cls._render_cache.move_to_end(key)
+                return cls._render_cache[key]
+
+        md_content = template.jinja_template().render(data)
+
+        with cls._render_cache_lock:
+            cls._render_cache[key] = md_content
+            cls._render_cache.move_to_end(key)
+            while len(cls._render_cache) > cls._RENDER_CACHE_MAX:
+                cls._render_cache.popitem(last=False)
+        return md_content
+
+    @classmethod
+    def _remember_cache_hit(cls, cache_key: str, path: str) -> None:
+        """登记缓存键到文件路径的映射，超出容量时按LRU淘汰"""
+        with cls._hit_cache_lock:
+            cls._hit_cache[cache_key] = path
+            cls._hit_cache.move_to_end(cache_key)
+            while len(cls._hit_cache) > cls._HIT_CACHE_MAX:
+                cls._hit_cache.popitem(last=False)
+
+    def _prune_cache(self) -> None:
+        """按TTL和总大小清理缓存目录"""
+        now = time.time()
+        cls = ReportService
+        if now - cls._last_cache_prune < cls._CACHE_PRUNE_INTERVAL:
+            return
+        cls._last_cache_prune = now
+
+        try:
+            entries = []
+            total_size = 0
+            deleted = set()
+            for path in self.cache_dir.iterdir():
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+                # 过期文件直接删除
+                if now - stat.st_mtime > cls._CACHE_TTL_SECONDS:
+                    path.unlink(missing_ok=True)
+                    deleted.add(str(path))
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+                total_size += stat.st_size
+
+            # 总量超限时按最久未访问优先淘汰
+            if total_size > cls._CACHE_MAX_BYTES:
+                entries.sort(key=lambda entry: entry[0])
+                for _, size, path in entries:
+                    if total_size <= cls._CACHE_MAX_BYTES:
+                        break
+                    path.unlink(missing_ok=True)
+                    deleted.add(str(path))
+                    total_size -= size
+
+            # 磁盘上已淘汰的文件不能继续留在内存层
+            if deleted:
+                with cls._hit_cache_lock:
+                    stale_keys = [key for key, value in cls._hit_cache.items() if value in deleted]
+                    for key in stale_keys:
+                        del cls._hit_cache[key]
+        except OSError as e:
+            self.logger.warning(f"清理报告缓存目录失败: {e}")
+
+    # 模板解析结果的类级缓存：按名称在所有服务实例间共享。
+    # 旧实现把lru_cache挂在绑定方法上，缓存键包含self，
+    # 每个请求新建的服务实例永远不命中，还把db会话钉在内存里。
+    _template_cache: Dict[str, ReportStructure] = {}
+    _template_cache_lock = threading.Lock()
+
     def get_template_by_name(self, name: str) -> ReportStructure:
         """
         根据名称获取模板
-        
+
         Args:
             name: 模板名称
-            
+
         Returns:
             ReportStructure: 模板对象
-            
+
         Raises:
             ValueError: 如果模板不存在
         """
+        with self._template_cache_lock:
+            cached = self._template_cache.get(name)
+        if cached is not None:
+            return cached
+
+        template = self._load_template(name)
+
+        with self._template_cache_lock:
+            self._template_cache[name] = template
+        return template
+
+    def _load_template(self, name: str) -> ReportStructure:
+        """从模板文件或数据库加载模板结构"""
         template_file = self.templates_dir / f"{name}.json"
         
         if not template_file.exists():
@@ -291,10 +611,11 @@ class ReportService:
         """
         file_path = self.templates_dir / f"{name}.json"
         template.save_to_file(str(file_path))
-        
-        # 清除缓存
-        self.get_template_by_name.cache_clear()
-        
+
+        # 清除该名称的缓存条目
+        with self._template_cache_lock:
+            self._template_cache.pop(name, None)
+
         return str(file_path)
     
     def create_project_report_template(self) -> ReportStructure:
@@ -431,52 +752,52 @@ class ReportService:
         根据模板和数据生成报告内容。
         这是一个简化的实现。
         """
+        # 输出先写入临时文件，完成后os.replace原子替换到目标路径，
+        # 并发读取缓存文件的一方永远不会看到半成品
+        tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            # 1. 使用Jinja2渲染模板
+            # 1. 使用Jinja2渲染模板；不含任何Jinja语法的模板跳过整个渲染环节
             md_template_str = template.to_markdown()
-            jinja_template = jinja2.Template(md_template_str)
-            md_content = jinja_template.render(data)
-            
+            has_placeholders = "{{" in md_template_str or "{%" in md_template_str
+
             # 2. 根据格式进行转换和保存
             if format == ReportFormatEnum.MARKDOWN:
-                with open(output_path, "w", encoding="utf-8") as f:
-                    f.write(md_content)
+                # Markdown走流式渲染：逐块写盘，不在内存中物化完整报告；
+                # 已被其他格式渲染过的(模板, 数据)直接写缓存字符串
+                if has_placeholders:
+                    cached = self._render_cache_get(template, data)
+                    if cached is not None:
+                        with open(tmp_path, "w", encoding="utf-8") as f:
+                            f.write(cached)
+                    else:
+                        template.jinja_template().stream(data).dump(tmp_path, encoding="utf-8")
+                else:
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.write(md_template_str)
+                os.replace(tmp_path, output_path)
                 return output_path
 
-            # 对于PDF和DOCX，我们先将Markdown转为HTML
-            html_content = markdown.markdown(md_content, extensions=['tables', 'fenced_code'])
-            
-            # 添加一些基础样式
-            html_with_style = f"""
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    body {{ font-family: 'SimSun', sans-serif; line-height: 1.6; }}
-                    h1, h2, h3 {{ color: #333; }}
-                    table {{ border-collapse: collapse; width: 100%; }}
-                    th, td {{ border: 1px solid #ddd; padding: 8px; }}
-                    th {{ background-color: #f2f2f2; }}
-                    code {{ font-family: 'Courier New', monospace; background-color: #eee; padding: 2px 4px; border-radius: 4px; }}
-                    pre > code {{ display: block; padding: 10px; }}
-                </style>
-            </head>
-            <body>
-                {html_content}
-            </body>
-            </html>
-            """
+            # PDF/DOCX都要完整的Markdown字符串，渲染结果按
+            # (模板指纹, 数据哈希)记忆，连续导出多格式只渲染一次
+            md_content = self._render_markdown_cached(template, data) if has_placeholders else md_template_str
 
             if format == ReportFormatEnum.PDF:
+                # weasyprint只接受HTML，此处才需要Markdown→HTML的转换
+                html_content = _get_md_converter().reset().convert(md_content)
+
+                # 套上模块级的静态样式外壳
+                html_with_style = _HTML_WRAPPER.replace("{body}", html_content)
+
                 from weasyprint import HTML
                 # 直接将带样式的HTML字符串传递给weasyprint
-                HTML(string=html_with_style).write_pdf(output_path)
-                
+                HTML(string=html_with_style).write_pdf(tmp_path)
+
             elif format == ReportFormatEnum.DOCX:
                 try:
                     import pypandoc
-                    # 使用pypandoc将HTML转换为docx
-                    pypandoc.convert_text(html_with_style, 'docx', format='html', outputfile=output_path)
+                    # Pandoc原生支持Markdown输入，直接转换可跳过HTML中间层，
+                    # 且对表格/代码块/标题的DOCX还原度更好
+                    pypandoc.convert_text(md_content, 'docx', format='md', outputfile=tmp_path)
                 except (ImportError, OSError) as e:
                     self.logger.warning(f"pypandoc 或其依赖未找到。DOCX 导出功能受限: {e}")
                     raise ReportGenerationException("无法生成DOCX，缺少pypandoc或其系统依赖。")
@@ -488,12 +809,45 @@ class ReportService:
                          raise ReportGenerationException("无法生成DOCX，缺少Pandoc程序。")
                     self.logger.error(f"使用pypandoc生成DOCX时发生未知错误: {e}", exc_info=True)
                     raise ReportGenerationException(f"生成DOCX时发生未知错误: {e}")
-            
+
+            os.replace(tmp_path, output_path)
             return output_path
 
         except Exception as e:
+            # 失败时清理残留的临时文件
+            Path(tmp_path).unlink(missing_ok=True)
             self.logger.error(f"生成报告时发生未知错误: {e}", exc_info=True)
             raise ReportGenerationException(f"生成报告失败：生成{format.value}时发生未知错误: {e}")
+
+    def generate_reports_batch(self, jobs: List[Tuple[ReportStructure, Dict[str, Any], ReportFormatEnum, str]],
+                               max_workers: Optional[int] = None) -> List[str]:
+        """
+        并行批量生成报告
+
+        DOCX/PDF转换是CPU密集且相互独立的操作，批量导出时通过进程池
+        绕过GIL并行执行；单份任务直接在当前进程完成，避免进程池开销。
+
+        Args:
+            jobs: (模板, 数据, 格式, 输出路径) 任务列表
+            max_workers: 进程数上限，默认由进程池按CPU核数决定
+
+        Returns:
+            List[str]: 与任务顺序一致的生成文件路径列表
+        """
+        if not jobs:
+            return []
+        if len(jobs) == 1:
+            template, data, format, output_path = jobs[0]
+            return [self.generate_report(template, data, format, output_path)]
+
+        # 模板结构序列化后传入子进程（数据库会话等不可序列化的状态不参与生成）
+        payloads = [
+            (template.to_dict(), data, format.value, output_path)
+            for template, data, format, output_path in jobs
+        ]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_generate_report_in_subprocess, payloads))
+
     def _generate_cache_key(self, template: ReportStructure, data: Dict[str, Any], 
                            format: ReportFormatEnum, include_toc: bool, 
                            include_code_highlighting: bool, include_styles: bool,
@@ -514,62 +868,127 @@ class ReportService:
         Returns:
             str: 缓存键
         """
-        # 使用模板、数据和所有格式化选项的哈希值作为缓存键
-        # 确保数据字典是可预测的顺序
-        # 对非字符串类型进行稳健的序列化
-        try:
-            # 尝试使用可排序的json dump来标准化数据
-            data_str = json.dumps(data, sort_keys=True)
-        except TypeError:
-            # 如果失败，回退到简单的str表示
-            data_str = str(data)
-            
-        key_string = (
-            template.to_markdown() + 
-            data_str + 
-            f"{format.value}{include_toc}{include_code_highlighting}{include_styles}{include_charts}" +
-            json.dumps(chart_data, sort_keys=True) if chart_data else ""
-        )
-        return hashlib.md5(key_string.encode('utf-8')).hexdigest()
+        # 使用模板、数据和所有格式化选项的哈希值作为缓存键。
+        # 数据按键排序后直接流式喂入哈希对象，不再拼接完整的序列化字符串，
+        # 内存占用保持O(1)；blake2b在标准库中也比MD5更快。
+        h = hashlib.blake2b(digest_size=16)
+        h.update(template.fingerprint().encode('ascii'))
+        self._hash_data(h, data)
+        h.update(f"{format.value}{include_toc}{include_code_highlighting}{include_styles}{include_charts}".encode('utf-8'))
+        if chart_data:
+            self._hash_data(h, chart_data)
+        return h.hexdigest()
+
+    @staticmethod
+    def _stable_token(value) -> str:
+        """
+        将无法JSON序列化的值转成跨请求稳定的字符串表示
+
+        ORM实体的默认str()带内存地址，同一行数据每次查询都会产生
+        不同的缓存键，缓存永远无法命中；改用(类名, 主键, 更新时间)
+        作为实体的身份，数据未变时键保持稳定，行被更新后键随之变化。
+        """
+        if hasattr(value, "__table__") and hasattr(value, "id"):
+            return f"{type(value).__name__}:{value.id}:{getattr(value, 'updated_at', None)}"
+        return str(value)
+
+    @classmethod
+    def _hash_data(cls, h, value) -> None:
+        """优先用orjson一次性序列化喂入哈希，无法序列化时退回规范化遍历"""
+        if ORJSON_AVAILABLE:
+            try:
+                # default让ORM对象等不可序列化值退化为稳定表示，
+                # 与纯Python规范化遍历的语义保持一致
+                h.update(orjson.dumps(
+                    value,
+                    option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+                    default=cls._stable_token,
+                ))
+                return
+            except TypeError:
+                pass
+        cls._hash_canonical(h, value)
+
+    @classmethod
+    def _hash_canonical(cls, h, value) -> None:
+        """
+        将嵌套数据按稳定顺序递归喂入哈希对象
+
+        字典按键排序，保证相同内容始终产生相同的缓存键；
+        无法JSON序列化的值经_stable_token退化为稳定表示。
+        """
+        if isinstance(value, dict):
+            h.update(b"{")
+            for key in sorted(value, key=str):
+                h.update(str(key).encode('utf-8'))
+                h.update(b":")
+                cls._hash_canonical(h, value[key])
+                h.update(b",")
+            h.update(b"}")
+        elif isinstance(value, (list, tuple)):
+            h.update(b"[")
+            for item in value:
+                cls._hash_canonical(h, item)
+                h.update(b",")
+            h.update(b"]")
+        else:
+            h.update(cls._stable_token(value).encode('utf-8', 'replace'))
     
-    def _replace_variables(self, content: str, data: Dict[str, Any]) -> str:
+    # 变量占位符的统一匹配模式：{{variable}}、${variable}、{variable}三种格式一次扫描
+    _VARIABLE_PATTERN = re.compile(
+        r"\{\{\s*([\w.]+)\s*\}\}|\$\{\s*([\w.]+)\s*\}|\{\s*([\w.]+)\s*\}"
+    )
+
+    def _replace_variables(self, content: str, data: Dict[str, Any],
+                           flat_data: Optional[Dict[str, Any]] = None) -> str:
         """
         替换内容中的变量占位符
-        
+
         支持多种占位符格式：
         1. {{variable}} - 双大括号
         2. {variable} - 单大括号
         3. ${variable} - 美元符号加大括号
         4. {{nested.value}} - 支持嵌套访问对象属性
-        
+
+        三种格式通过一个预编译的交替模式在单次扫描中完成替换，
+        未知的占位符保持原样。
+
         Args:
             content: 包含变量占位符的内容
             data: 变量数据
-            
+            flat_data: 预先扁平化的数据；同一份data对多段内容做替换时
+                调用方可用_flatten_data(data)算一次后复用，免去逐段重复扁平化
+
         Returns:
             str: 替换变量后的内容
         """
-        result = content
-        
-        # 扁平化嵌套数据
-        flat_data = self._flatten_data(data)
-        
-        # 替换双大括号格式的变量 {{variable}}
-        for key, value in flat_data.items():
-            pattern = r"\{\{\s*" + re.escape(key) + r"\s*\}\}"
-            result = re.sub(pattern, str(value) if value is not None else "", result)
-        
-        # 替换单大括号格式的变量 {variable}
-        for key, value in flat_data.items():
-            pattern = r"\{\s*" + re.escape(key) + r"\s*\}"
-            result = re.sub(pattern, str(value) if value is not None else "", result)
-        
-        # 替换美元符号加大括号格式的变量 ${variable}
-        for key, value in flat_data.items():
-            pattern = r"\$\{\s*" + re.escape(key) + r"\s*\}"
-            result = re.sub(pattern, str(value) if value is not None else "", result)
-        
-        return result
+        # 快速路径：三种占位符格式都以"{"开头，内容中没有就无需扫描
+        if "{" not in content or not (data or flat_data):
+            return content
+
+        if flat_data is None:
+            # 先扫描内容中实际引用的根变量，只扁平化被引用的分支；
+            # 上下文中未被模板使用的对象（如ORM实体）不付出展开成本
+            roots = {
+                (match.group(1) or match.group(2) or match.group(3)).split(".", 1)[0]
+                for match in self._VARIABLE_PATTERN.finditer(content)
+            }
+            used_data = {key: value for key, value in data.items() if key in roots}
+            if not used_data:
+                return content
+
+            # 扁平化嵌套数据
+            flat_data = self._flatten_data(used_data)
+
+        def _substitute(match: "re.Match") -> str:
+            key = match.group(1) or match.group(2) or match.group(3)
+            if key in flat_data:
+                value = flat_data[key]
+                return str(value) if value is not None else ""
+            # 未知变量保持原样
+            return match.group(0)
+
+        return self._VARIABLE_PATTERN.sub(_substitute, content)
     
     def _flatten_data(self, data: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
         """
@@ -586,38 +1005,48 @@ class ReportService:
             Dict[str, Any]: 扁平化的字典
         """
         result = {}
-        
-        for key, value in data.items():
-            new_key = f"{prefix}{key}" if prefix else key
-            
-            if isinstance(value, dict):
-                # 递归扁平化嵌套字典
-                nested_result = self._flatten_data(value, f"{new_key}.")
-                result.update(nested_result)
-            elif isinstance(value, list) and all(isinstance(item, dict) for item in value):
-                # 处理字典列表
-                for i, item in enumerate(value):
-                    nested_result = self._flatten_data(item, f"{new_key}.{i}.")
-                    result.update(nested_result)
-            else:
-                # 普通值
-                result[new_key] = value
-        
+        # 显式栈代替递归：省去每层嵌套的函数调用开销和中间字典合并
+        stack = [(prefix, data)]
+
+        while stack:
+            current_prefix, current = stack.pop()
+            for key, value in current.items():
+                new_key = f"{current_prefix}{key}" if current_prefix else key
+
+                if isinstance(value, dict):
+                    # 嵌套字典入栈待展开
+                    stack.append((f"{new_key}.", value))
+                elif isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+                    # 处理字典列表（空列表走普通值分支，不会被丢弃）
+                    for i, item in enumerate(value):
+                        stack.append((f"{new_key}.{i}.", item))
+                else:
+                    # 普通值
+                    result[new_key] = value
+
         return result
 
     def get_report_by_id(self, report_id: int) -> Optional[Report]:
         return self.db.query(Report).filter(Report.id == report_id).first()
 
-    def delete_report(self, report_id: int, user_id: int) -> Optional[Report]:
-        """删除一个报告，并确保只有所有者才能删除"""
-        report_to_delete = self.db.query(Report).filter(
+    def delete_report(self, report_id: int, user_id: int) -> int:
+        """
+        删除一个报告，并确保只有所有者才能删除
+
+        通过轻量的存在性检查加批量DELETE完成，不物化整个ORM对象；
+        返回删除的报告行数（0表示不存在或无权限）。
+        """
+        exists = self.db.query(Report.id).filter(
             Report.id == report_id, Report.owner_id == user_id
-        ).first()
+        ).scalar()
+        if exists is None:
+            return 0
 
-        if report_to_delete:
-            self.db.delete(report_to_delete)
-            self.db.commit()
-        return report_to_delete
+        # 批量DELETE不触发ORM级联，先显式删除章节再删报告
+        self.db.query(ReportSection).filter(ReportSection.report_id == report_id).delete(synchronize_session=False)
+        deleted = self.db.query(Report).filter(Report.id == report_id).delete(synchronize_session=False)
+        self.db.commit()
+        return deleted
 
     def update_report_status(self, report_id: int, status: ReportStatusEnum) -> Optional[Report]:
         """更新报告状态"""
@@ -640,7 +1069,13 @@ class ReportService:
         为指定报告生成文件并返回其路径、MIME类型和文件名。
         此方法现在是通用的，可以处理所有支持的报告格式。
         """
-        db_report = self.get_report(report_id, user_id)
+        # 一次查询带出所有者与模板，避免后续属性访问触发额外的数据库往返
+        db_report = (
+            self.db.query(Report)
+            .options(joinedload(Report.owner), joinedload(Report.template))
+            .filter(Report.id == report_id, Report.owner_id == user_id)
+            .first()
+        )
         if not db_report:
             raise HTTPException(status_code=404, detail="报告未找到")
 
@@ -655,12 +1090,12 @@ class ReportService:
         }
         media_type = mime_types.get(report_format, "application/octet-stream")
 
-        # 动态生成文件名
-        file_extension = report_format.value.lower()
+        # 动态生成文件名（枚举值本身就是小写扩展名）
+        file_extension = report_format.value
         filename = f"{db_report.title or 'report'}_{db_report.id}.{file_extension}"
 
-        # 检查报告模板是否存在
-        template = self.db.query(ReportTemplateModel).filter(ReportTemplateModel.id == db_report.template_id).first()
+        # 检查报告模板是否存在（已随报告一并加载）
+        template = db_report.template
         if not template:
             raise HTTPException(status_code=404, detail=f"ID为 {db_report.template_id} 的模板未找到")
         
@@ -673,11 +1108,11 @@ class ReportService:
             "competitions": self.db.query(Competition).filter(Competition.id.in_(db_report.extra_info.get("competition_ids", []))).all()
         }
 
-        # --- 新增：确保所有模板变量都存在于上下文中 ---
+        # --- 确保所有模板变量都存在于上下文中 ---
         md_template_str = template_structure.to_markdown()
-        # 使用正则表达式查找所有 {{...}} 格式的变量
-        template_variables = set(re.findall(r"\\{\\{\\s*([^\\}]+?)\\s*\\}\\}", md_template_str))
-        
+        # 变量集合按 (模板ID, updated_at) 缓存，模板未改动时免去重复扫描
+        template_variables = _vars_for_template(template.id, template.updated_at, md_template_str)
+
         for var in template_variables:
             # 对于嵌套变量如 "user.name"，我们只检查根变量 "user"
             root_var = var.split('.')[0]
@@ -700,12 +1135,32 @@ class ReportService:
         )
         cache_file_path = self.cache_dir / f"{cache_key}.{file_extension}"
 
+        # 内存层：热点报告的重复请求先查内存映射。命中后仍用一次stat
+        # 确认文件还在——缓存文件可能被其他进程的清理或外部操作删除，
+        # 内存条目只在删除发生的进程里同步淘汰
+        with ReportService._hit_cache_lock:
+            cached_path = ReportService._hit_cache.get(cache_key)
+            if cached_path is not None:
+                ReportService._hit_cache.move_to_end(cache_key)
+        if cached_path is not None:
+            if Path(cached_path).exists():
+                return cached_path, media_type, filename
+            # 文件已不存在：淘汰死条目，走磁盘检查/重新生成
+            with ReportService._hit_cache_lock:
+                ReportService._hit_cache.pop(cache_key, None)
+
         # 如果缓存文件已存在，直接返回路径
         if cache_file_path.exists():
+            self._remember_cache_hit(cache_key, str(cache_file_path))
             return str(cache_file_path), media_type, filename
 
-        # 调用核心生成方法
-        generated_path = self.generate_report(
+        # 顺带清理过期/超量的缓存文件（带节流，通常是空操作）
+        self._prune_cache()
+
+        # 调用核心生成方法：PDF/DOCX转换是CPU密集操作，放到工作线程执行，
+        # 避免阻塞事件循环
+        generated_path = await asyncio.to_thread(
+            self.generate_report,
             template=template_structure,
             data=context,
             format=report_format,
@@ -715,6 +1170,7 @@ class ReportService:
         if not generated_path:
              raise ReportGenerationException("报告文件生成失败，未返回有效路径。")
 
+        self._remember_cache_hit(cache_key, generated_path)
         return generated_path, media_type, filename
 
     def get_user_reports_paginated(self, user_id: int, page: int, page_size: int):
@@ -724,4 +1180,15 @@ class ReportService:
         # 这里需要实现分页逻辑，例如：
         # total_reports = self.db.query(Report).filter(Report.owner_id == user_id).count()
         # reports = self.db.query(Report).filter(Report.owner_id == user_id).offset((page - 1) * page_size).limit(page_size).all()
-        # return total_reports, reports 
\ No newline at end of file
+        # return total_reports, reports 
+
+def _generate_report_in_subprocess(payload: Tuple[Dict[str, Any], Dict[str, Any], str, str]) -> str:
+    """
+    进程池工作函数：在子进程中重建模板结构并生成单份报告
+
+    generate_report本身不依赖数据库会话，子进程中以db=None构建服务即可。
+    """
+    template_data, data, format_value, output_path = payload
+    service = ReportService(db=None)
+    template = ReportStructure.from_dict(template_data)
+    return service.generate_report(template, data, ReportFormatEnum(format_value), output_path)
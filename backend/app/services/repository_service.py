@@ -2,13 +2,57 @@ import os
 import shutil
 import git
 import logging
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Iterator, Optional, Union
 from pathlib import Path
 
 from backend.app.core.config import settings
 from backend.app.core.exceptions import RepositoryException
 from backend.app.core.logging import logger
 
+# 初始仓库结构的文件内容，整块写入而不是逐行write
+_INITIAL_README = """# 组件仓库
+
+这是一个用于存储和管理代码组件的仓库。
+
+## 目录结构
+
+- `components/`: 组件目录
+  - `<类别>/`: 按类别组织的组件
+    - `<组件名>/`: 具体组件
+      - `metadata.json`: 组件元数据
+      - `README.md`: 组件文档
+      - 其他组件文件
+"""
+
+_INITIAL_GITIGNORE = """# Python
+__pycache__/
+*.py[cod]
+*$py.class
+*.so
+.Python
+env/
+build/
+develop-eggs/
+dist/
+downloads/
+eggs/
+.eggs/
+lib/
+lib64/
+parts/
+sdist/
+var/
+*.egg-info/
+.installed.cfg
+*.egg
+
+# IDE
+.idea/
+.vscode/
+*.swp
+*.swo
+"""
+
 class RepositoryService:
     """
     零件仓库管理服务
@@ -23,6 +67,9 @@ class RepositoryService:
         self.repo_branch = settings.COMPONENTS_REPO_BRANCH
         self.local_path = Path(settings.COMPONENTS_REPO_LOCAL_PATH)
         self.repo = None
+        # 远程名集合只在打开/克隆仓库时解析一次，GitPython的
+        # repo.remotes每次访问都会重新读配置
+        self._remote_names = set()
         
     def setup_repository(self) -> bool:
         """
@@ -41,16 +88,22 @@ class RepositoryService:
                 # 克隆仓库
                 if self.repo_url:
                     logger.info(f"克隆仓库: {self.repo_url}")
+                    # 组件仓库只需要当前树，浅克隆把传输量和.git体积
+                    # 从O(历史)降到O(树)
                     self.repo = git.Repo.clone_from(
                         self.repo_url,
                         self.local_path,
-                        branch=self.repo_branch
+                        branch=self.repo_branch,
+                        depth=1,
+                        single_branch=True
                     )
+                    self._remote_names = {remote.name for remote in self.repo.remotes}
                 else:
                     # 如果没有提供URL，则初始化一个新的本地仓库
                     logger.info("初始化新的本地仓库")
                     self.repo = git.Repo.init(self.local_path)
-                    
+                    self._remote_names = set()
+
                     # 创建初始结构
                     self._create_initial_structure()
                     
@@ -59,12 +112,13 @@ class RepositoryService:
             else:
                 # 打开现有仓库
                 self.repo = git.Repo(self.local_path)
-                
+                self._remote_names = {remote.name for remote in self.repo.remotes}
+
                 # 如果有远程仓库，则拉取最新更改
-                if self.repo_url and "origin" in [remote.name for remote in self.repo.remotes]:
+                if self.repo_url and "origin" in self._remote_names:
                     logger.info("拉取最新更改")
                     origin = self.repo.remotes.origin
-                    origin.fetch()
+                    # pull内部已包含fetch，单独fetch一次纯属重复的网络往返
                     origin.pull()
                     
             return True
@@ -75,28 +129,50 @@ class RepositoryService:
             logger.error(f"设置仓库时出错: {str(e)}")
             raise RepositoryException(f"设置仓库时出错: {str(e)}")
             
-    def commit_changes(self, message: str) -> str:
+    def _ensure_open(self) -> None:
+        """
+        确保仓库句柄可用
+
+        本地仓库已存在时只打开句柄，不触发任何网络同步；
+        读写方法统一走这里，拉取远程更新仍由setup_repository负责。
+        """
+        if self.repo:
+            return
+        if os.path.exists(self.local_path / ".git"):
+            self.repo = git.Repo(self.local_path)
+            self._remote_names = {remote.name for remote in self.repo.remotes}
+        else:
+            self.setup_repository()
+
+    def commit_changes(self, message: str, paths: Optional[List[str]] = None) -> str:
         """
         提交更改到仓库
-        
+
         Args:
             message: 提交消息
-            
+            paths: 只暂存这些文件（相对于仓库根目录）；
+                缺省时暂存所有更改
+
         Returns:
             str: 提交ID
-            
+
         Raises:
             RepositoryException: 提交失败
         """
         try:
-            if not self.repo:
-                self.setup_repository()
-                
-            # 添加所有更改
-            self.repo.git.add(all=True)
+            self._ensure_open()
+
+            if paths:
+                # 调用方知道自己只写了哪些文件时，按路径暂存，
+                # 省去git add --all对整个工作树逐文件stat的扫描
+                self.repo.index.add(paths)
+            else:
+                # 添加所有更改
+                self.repo.git.add(all=True)
             
-            # 检查是否有更改
-            if not self.repo.is_dirty() and not self.repo.untracked_files:
+            # 检查是否有更改：status --porcelain一次子进程同时覆盖
+            # 已跟踪改动和未跟踪文件，省去is_dirty+untracked_files两次调用
+            if not self.repo.git.status('--porcelain'):
                 logger.info("没有更改需要提交")
                 # 返回最新提交的ID
                 return self.repo.head.commit.hexsha
@@ -106,7 +182,7 @@ class RepositoryService:
             logger.info(f"提交更改: {commit.hexsha}")
             
             # 如果有远程仓库，则推送更改
-            if self.repo_url and "origin" in [remote.name for remote in self.repo.remotes]:
+            if self.repo_url and "origin" in self._remote_names:
                 logger.info("推送更改到远程仓库")
                 origin = self.repo.remotes.origin
                 origin.push()
@@ -130,8 +206,7 @@ class RepositoryService:
             RepositoryException: 重置失败
         """
         try:
-            if not self.repo:
-                self.setup_repository()
+            self._ensure_open()
                 
             # 重置所有更改
             self.repo.git.reset('--hard')
@@ -162,22 +237,80 @@ class RepositoryService:
             RepositoryException: 获取文件内容失败
         """
         try:
-            if not self.repo:
-                self.setup_repository()
-                
-            full_path = os.path.join(self.local_path, file_path)
-            
-            if not os.path.exists(full_path):
+            self._ensure_open()
+
+            # 直接读取并处理FileNotFoundError，省去一次独立的exists()探测
+            try:
+                return (self.local_path / file_path).read_text(encoding='utf-8')
+            except FileNotFoundError:
                 raise RepositoryException(f"文件不存在: {file_path}")
-                
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            return content
         except Exception as e:
             logger.error(f"获取文件内容时出错: {str(e)}")
             raise RepositoryException(f"获取文件内容时出错: {str(e)}")
             
+    def stream_file_content(self, file_path: str, chunk_size: int = 65536) -> Iterator[bytes]:
+        """
+        以块为单位流式读取文件内容
+
+        大文件（二进制组件、模型权重等）整读进内存会让峰值内存
+        随文件大小线性增长；只需转发字节流的调用方（如HTTP下载
+        接口配合StreamingResponse）应使用本方法，常驻内存恒定为
+        一个chunk。
+
+        Args:
+            file_path: 文件路径（相对于仓库根目录）
+            chunk_size: 每块字节数
+
+        Yields:
+            bytes: 文件内容块
+
+        Raises:
+            RepositoryException: 文件不存在或读取失败
+        """
+        self._ensure_open()
+
+        try:
+            f = open(self.local_path / file_path, 'rb')
+        except FileNotFoundError:
+            raise RepositoryException(f"文件不存在: {file_path}")
+        except Exception as e:
+            logger.error(f"流式读取文件时出错: {str(e)}")
+            raise RepositoryException(f"流式读取文件时出错: {str(e)}")
+
+        with f:
+            yield from iter(lambda: f.read(chunk_size), b'')
+
+    def get_files_content(self, file_paths: List[str]) -> Dict[str, str]:
+        """
+        批量获取多个文件的内容
+
+        仓库初始化检查只做一次，随后逐个读取；列出组件等需要
+        一次拉取大量文件的调用方应优先使用本方法，而不是在循环里
+        反复调用get_file_content。
+
+        Args:
+            file_paths: 文件路径列表（相对于仓库根目录）
+
+        Returns:
+            Dict[str, str]: 文件路径到内容的映射
+
+        Raises:
+            RepositoryException: 任一文件读取失败
+        """
+        try:
+            self._ensure_open()
+
+            contents = {}
+            for file_path in file_paths:
+                try:
+                    contents[file_path] = (self.local_path / file_path).read_text(encoding='utf-8')
+                except FileNotFoundError:
+                    raise RepositoryException(f"文件不存在: {file_path}")
+            return contents
+        except Exception as e:
+            logger.error(f"批量获取文件内容时出错: {str(e)}")
+            raise RepositoryException(f"批量获取文件内容时出错: {str(e)}")
+
     def get_file_history(self, file_path: str, max_count: int = 10) -> List[Dict[str, str]]:
         """
         获取文件的提交历史
@@ -193,8 +326,7 @@ class RepositoryService:
             RepositoryException: 获取历史失败
         """
         try:
-            if not self.repo:
-                self.setup_repository()
+            self._ensure_open()
                 
             full_path = os.path.join(self.local_path, file_path)
             
@@ -221,53 +353,64 @@ class RepositoryService:
             logger.error(f"获取文件历史时出错: {str(e)}")
             raise RepositoryException(f"获取文件历史时出错: {str(e)}")
             
+    def get_files_history(self, file_paths: List[str], max_count: int = 10) -> Dict[str, List[Dict[str, str]]]:
+        """
+        批量获取多个文件的提交历史
+
+        只遍历一次提交历史，按commit.stats.files把每个提交分发到
+        它触及的文件名下；逐文件调用get_file_history会对每个文件
+        重走一遍历史，代价是O(文件数×提交数)。
+
+        Args:
+            file_paths: 文件路径列表（相对于仓库根目录）
+            max_count: 每个文件的最大提交数
+
+        Returns:
+            Dict[str, List[Dict[str, str]]]: 文件路径到提交历史的映射
+
+        Raises:
+            RepositoryException: 获取历史失败
+        """
+        try:
+            self._ensure_open()
+
+            wanted = set(file_paths)
+            history = {file_path: [] for file_path in file_paths}
+
+            # paths参数让git只回放触及这些文件的提交
+            for commit in self.repo.iter_commits(paths=file_paths):
+                touched = wanted.intersection(commit.stats.files)
+                entry = None
+                for file_path in touched:
+                    if len(history[file_path]) >= max_count:
+                        continue
+                    if entry is None:
+                        entry = {
+                            'commit_id': commit.hexsha,
+                            'author': f"{commit.author.name} <{commit.author.email}>",
+                            'date': commit.committed_datetime.isoformat(),
+                            'message': commit.message,
+                        }
+                    history[file_path].append(entry)
+
+                if all(len(entries) >= max_count for entries in history.values()):
+                    break
+
+            return history
+        except git.GitCommandError as e:
+            logger.error(f"Git命令错误: {str(e)}")
+            raise RepositoryException(f"批量获取文件历史时出错: {str(e)}")
+        except Exception as e:
+            logger.error(f"批量获取文件历史时出错: {str(e)}")
+            raise RepositoryException(f"批量获取文件历史时出错: {str(e)}")
+
     def _create_initial_structure(self) -> None:
         """
         创建初始仓库结构
         """
         # 创建组件目录
-        components_dir = os.path.join(self.local_path, "components")
-        os.makedirs(components_dir, exist_ok=True)
-        
-        # 创建README文件
-        readme_path = os.path.join(self.local_path, "README.md")
-        with open(readme_path, 'w', encoding='utf-8') as f:
-            f.write("# 组件仓库\n\n")
-            f.write("这是一个用于存储和管理代码组件的仓库。\n\n")
-            f.write("## 目录结构\n\n")
-            f.write("- `components/`: 组件目录\n")
-            f.write("  - `<类别>/`: 按类别组织的组件\n")
-            f.write("    - `<组件名>/`: 具体组件\n")
-            f.write("      - `metadata.json`: 组件元数据\n")
-            f.write("      - `README.md`: 组件文档\n")
-            f.write("      - 其他组件文件\n")
-            
-        # 创建.gitignore文件
-        gitignore_path = os.path.join(self.local_path, ".gitignore")
-        with open(gitignore_path, 'w', encoding='utf-8') as f:
-            f.write("# Python\n")
-            f.write("__pycache__/\n")
-            f.write("*.py[cod]\n")
-            f.write("*$py.class\n")
-            f.write("*.so\n")
-            f.write(".Python\n")
-            f.write("env/\n")
-            f.write("build/\n")
-            f.write("develop-eggs/\n")
-            f.write("dist/\n")
-            f.write("downloads/\n")
-            f.write("eggs/\n")
-            f.write(".eggs/\n")
-            f.write("lib/\n")
-            f.write("lib64/\n")
-            f.write("parts/\n")
-            f.write("sdist/\n")
-            f.write("var/\n")
-            f.write("*.egg-info/\n")
-            f.write(".installed.cfg\n")
-            f.write("*.egg\n\n")
-            f.write("# IDE\n")
-            f.write(".idea/\n")
-            f.write(".vscode/\n")
-            f.write("*.swp\n")
-            f.write("*.swo\n") 
\ No newline at end of file
+        (self.local_path / "components").mkdir(parents=True, exist_ok=True)
+
+        # README和.gitignore各自一次整块写入
+        (self.local_path / "README.md").write_text(_INITIAL_README, encoding='utf-8')
+        (self.local_path / ".gitignore").write_text(_INITIAL_GITIGNORE, encoding='utf-8')
\ No newline at end of file
@@ -38,28 +38,43 @@ class TemplateInitializationService:
             }
         ]
         
+        # 已存在的模板名一次IN查询取回，活跃AI模型也只查一次，
+        # 不再在循环里对每个模板做两次数据库往返
+        template_names = [template_data["name"] for template_data in default_templates]
+        existing_names = {
+            row[0]
+            for row in self.db.query(PersonalizationTemplate.name)
+            .filter(PersonalizationTemplate.name.in_(template_names))
+            .all()
+        }
+
+        missing = [t for t in default_templates if t["name"] not in existing_names]
+        if not missing:
+            return []
+
+        # 找到一个活跃的AI模型来关联
+        default_model = self.db.query(AIModel).filter_by(is_active=True).first()
+        if not default_model:
+            for template_data in missing:
+                self.logger.warning(f"没有找到活跃的AI模型，无法创建模板 {template_data['name']}")
+            return []
+
+        now = datetime.utcnow()
         created_templates = []
-        for template_data in default_templates:
-            existing_template = self.db.query(PersonalizationTemplate).filter_by(name=template_data["name"]).first()
-            if not existing_template:
-                # 找到一个活跃的AI模型来关联
-                default_model = self.db.query(AIModel).filter_by(is_active=True).first()
-                if not default_model:
-                    self.logger.warning(f"没有找到活跃的AI模型，无法创建模板 {template_data['name']}")
-                    continue
-                    
-                new_template = PersonalizationTemplate(
-                    name=template_data["name"],
-                    task_type=template_data["task_type"],
-                    prompt_template=template_data["prompt_template"],
-                    is_active=template_data["is_active"],
-                    ai_model_id=default_model.id,
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
-                )
-                self.db.add(new_template)
-                created_templates.append(new_template)
-                self.logger.info(f"创建默认模板: {new_template.name}")
+        for template_data in missing:
+            new_template = PersonalizationTemplate(
+                name=template_data["name"],
+                task_type=template_data["task_type"],
+                prompt_template=template_data["prompt_template"],
+                is_active=template_data["is_active"],
+                ai_model_id=default_model.id,
+                created_at=now,
+                updated_at=now
+            )
+            created_templates.append(new_template)
+            self.logger.info(f"创建默认模板: {new_template.name}")
 
+        # 批量写入后单次提交
+        self.db.bulk_save_objects(created_templates)
         self.db.commit()
         return created_templates 
\ No newline at end of file
@@ -2,6 +2,7 @@ import os
 import re
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple, Any
 from pathlib import Path
 
@@ -10,6 +11,21 @@ from backend.app.core.logging import logger
 from backend.app.core.exceptions import ValidationException
 
 
+# 校验用到的正则在模块导入时编译一次，逐次调用不再重复编译
+_VERSION_RE = re.compile(r"^\d+\.\d+\.\d+$")
+_PY_DEF_RE = re.compile(r"def\s+(\w+)\([^)]*\):")
+_PY_CLASS_RE = re.compile(r"class\s+(\w+)[^:]*:")
+_JS_FUNC_RE = re.compile(r"function\s+(\w+)\([^)]*\)|const\s+(\w+)\s*=\s*\([^)]*\)\s*=>")
+_MD_TITLE_RE = re.compile(r"^#\s+\w+", re.MULTILINE)
+_MD_SECTION_RE = re.compile(r"^##\s+\w+", re.MULTILINE)
+_MODULE_DOC_RE = re.compile(r'"""[^"]+"""')
+_DOCSTRING_AT_RE = re.compile(r'\s*"""')
+_TEST_FILE_RE = re.compile(r"^test_|_test\.py$|\.test\.js$|\.spec\.js$")
+
+# 测试文件扫描时不值得深入的目录
+_SKIP_DIRS = {"__pycache__", "node_modules", ".git", "venv", "env"}
+
+
 class ValidationService:
     """
     验证服务
@@ -29,41 +45,54 @@ class ValidationService:
         # 定义最大代码复杂度
         self.max_complexity = 10
         
-    def validate_component(self, component_path: str, files: Dict[str, Any]) -> Tuple[bool, List[str]]:
+    def validate_component(self, component_path: str, files: Dict[str, Any],
+                           fast: bool = False) -> Tuple[bool, List[str]]:
         """
         验证组件
-        
+
         Args:
             component_path: 组件目录路径
             files: 组件文件
-            
+            fast: 只关心通过与否时置True，跳过仅产生警告的扫描
+
         Returns:
             Tuple[bool, List[str]]: (是否通过验证, 验证消息列表)
         """
         messages = []
-        
+
+        # 目录快照只做一次：四个验证器共享同一份文件名列表，
+        # 免去每个验证器各自listdir加逐项stat的重复系统调用
+        dir_files = self._list_component_files(component_path)
+
         # 验证组件结构
-        structure_valid, structure_messages = self._validate_structure(component_path, files)
+        structure_valid, structure_messages = self._validate_structure(component_path, files, dir_files)
         messages.extend(structure_messages)
-        
+
         # 验证元数据
-        metadata_valid, metadata_messages = self._validate_metadata(component_path)
+        metadata_valid, metadata_messages = self._validate_metadata(component_path, dir_files)
         messages.extend(metadata_messages)
-        
+
         # 验证代码质量
-        code_valid, code_messages = self._validate_code_quality(component_path, files)
+        code_valid, code_messages = self._validate_code_quality(component_path, files, dir_files, fast)
         messages.extend(code_messages)
-        
+
         # 验证文档
-        doc_valid, doc_messages = self._validate_documentation(component_path, files)
+        doc_valid, doc_messages = self._validate_documentation(component_path, files, dir_files, fast)
         messages.extend(doc_messages)
         
         # 所有验证都通过才返回True
         is_valid = structure_valid and metadata_valid and code_valid and doc_valid
-        
+
         return is_valid, messages
-    
-    def _validate_structure(self, component_path: str, files: Dict[str, Any]) -> Tuple[bool, List[str]]:
+
+    @staticmethod
+    def _list_component_files(component_path: str) -> List[str]:
+        """扫描组件目录一次，返回其中普通文件的文件名列表"""
+        # scandir的DirEntry自带文件类型信息，无需对每个条目再stat
+        return [entry.name for entry in os.scandir(component_path) if entry.is_file()]
+
+    def _validate_structure(self, component_path: str, files: Dict[str, Any],
+                            dir_files: Optional[List[str]] = None) -> Tuple[bool, List[str]]:
         """
         验证组件结构
         
@@ -76,61 +105,65 @@ class ValidationService:
         """
         messages = []
         is_valid = True
-        
+
+        if dir_files is None:
+            dir_files = self._list_component_files(component_path)
+
         # 检查必需文件
         for required_file in self.required_files:
-            file_path = os.path.join(component_path, required_file)
-            if not os.path.exists(file_path) and required_file not in files:
+            if required_file not in dir_files and required_file not in files:
                 is_valid = False
                 messages.append(f"缺少必需文件: {required_file}")
-        
+
         # 检查目录结构
-        if not any(f.endswith(".py") or f.endswith(".js") or f.endswith(".ts") or f.endswith(".java") or f.endswith(".c") or f.endswith(".cpp") for f in os.listdir(component_path) if os.path.isfile(os.path.join(component_path, f))):
+        if not any(f.endswith(".py") or f.endswith(".js") or f.endswith(".ts") or f.endswith(".java") or f.endswith(".c") or f.endswith(".cpp") for f in dir_files):
             if not any(f.endswith(".py") or f.endswith(".js") or f.endswith(".ts") or f.endswith(".java") or f.endswith(".c") or f.endswith(".cpp") for f in files):
                 is_valid = False
                 messages.append("组件必须包含至少一个源代码文件 (.py, .js, .ts, .java, .c, .cpp)")
         
-        # 检查是否有测试文件
+        # 检查是否有测试文件：命中即止，且不深入node_modules等无关大目录
         has_test = False
-        for root, _, filenames in os.walk(component_path):
-            for filename in filenames:
-                if filename.startswith("test_") or filename.endswith("_test.py") or filename.endswith(".test.js") or filename.endswith(".spec.js"):
-                    has_test = True
-                    break
-        
+        for root, dirnames, filenames in os.walk(component_path):
+            dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS]
+            if any(_TEST_FILE_RE.search(filename) for filename in filenames):
+                has_test = True
+                break
+
         if not has_test:
-            for filename in files:
-                if filename.startswith("test_") or filename.endswith("_test.py") or filename.endswith(".test.js") or filename.endswith(".spec.js"):
-                    has_test = True
-                    break
-        
+            has_test = any(_TEST_FILE_RE.search(filename) for filename in files)
+
         if not has_test:
             messages.append("警告: 未发现测试文件，建议添加测试")
         
         return is_valid, messages
     
-    def _validate_metadata(self, component_path: str) -> Tuple[bool, List[str]]:
+    def _validate_metadata(self, component_path: str,
+                           dir_files: Optional[List[str]] = None) -> Tuple[bool, List[str]]:
         """
         验证组件元数据
-        
+
         Args:
             component_path: 组件目录路径
-            
+            dir_files: 组件目录的文件名快照（缺省时自行扫描）
+
         Returns:
             Tuple[bool, List[str]]: (是否通过验证, 验证消息列表)
         """
         messages = []
         is_valid = True
-        
-        metadata_path = os.path.join(component_path, "metadata.json")
-        
-        if not os.path.exists(metadata_path):
+
+        if dir_files is None:
+            dir_files = self._list_component_files(component_path)
+
+        metadata_path = Path(component_path) / "metadata.json"
+
+        if "metadata.json" not in dir_files:
             return False, ["缺少元数据文件: metadata.json"]
-        
+
         try:
-            with open(metadata_path, "r", encoding="utf-8") as f:
-                metadata = json.load(f)
-                
+            metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+
+
             # 检查必需字段
             required_fields = ["name", "version", "category"]
             for field in required_fields:
@@ -140,8 +173,7 @@ class ValidationService:
             
             # 检查版本格式
             if "version" in metadata and metadata["version"]:
-                version_pattern = r"^\d+\.\d+\.\d+$"
-                if not re.match(version_pattern, metadata["version"]):
+                if not _VERSION_RE.match(metadata["version"]):
                     is_valid = False
                     messages.append(f"版本格式无效: {metadata['version']}，应为 x.y.z 格式")
             
@@ -160,133 +192,159 @@ class ValidationService:
             
         return is_valid, messages
     
-    def _validate_code_quality(self, component_path: str, files: Dict[str, Any]) -> Tuple[bool, List[str]]:
+    def _validate_code_quality(self, component_path: str, files: Dict[str, Any],
+                               dir_files: Optional[List[str]] = None,
+                               fast: bool = False) -> Tuple[bool, List[str]]:
         """
         验证代码质量
-        
+
         Args:
             component_path: 组件目录路径
             files: 组件文件
-            
+            dir_files: 组件目录的文件名快照（缺省时自行扫描）
+            fast: 为True时跳过逐文件扫描（其结果几乎只用于警告提示）
+
         Returns:
             Tuple[bool, List[str]]: (是否通过验证, 验证消息列表)
         """
+        if fast:
+            return True, []
+
         messages = []
         is_valid = True
-        
+
+        if dir_files is None:
+            dir_files = self._list_component_files(component_path)
+
+        component_dir = Path(component_path)
+
         # 检查Python文件
-        python_files = [f for f in os.listdir(component_path) if f.endswith(".py") and os.path.isfile(os.path.join(component_path, f))]
+        python_files = [f for f in dir_files if f.endswith(".py")]
         python_files.extend([f for f in files if f.endswith(".py")])
-        
-        for py_file in python_files:
-            if py_file in files:
-                content = files[py_file].decode("utf-8")
-            else:
-                try:
-                    with open(os.path.join(component_path, py_file), "r", encoding="utf-8") as f:
-                        content = f.read()
-                except Exception as e:
-                    is_valid = False
-                    messages.append(f"读取文件 {py_file} 时出错: {str(e)}")
-                    continue
-            
-            # 检查行长度
-            lines = content.split("\n")
-            for i, line in enumerate(lines):
-                if len(line.strip()) > 100:
-                    messages.append(f"警告: {py_file}:{i+1} 行过长 ({len(line)} > 100)")
-            
-            # 检查函数长度
-            functions = re.findall(r"def\s+\w+\([^)]*\):", content)
-            for func in functions:
-                func_name = re.search(r"def\s+(\w+)", func).group(1)
-                # 简单估算函数长度
-                func_start = content.find(func)
-                next_func = content.find("def ", func_start + 1)
-                if next_func == -1:
-                    next_func = len(content)
-                func_content = content[func_start:next_func]
-                func_lines = func_content.count("\n")
-                if func_lines > 50:
-                    messages.append(f"警告: {py_file} 中的函数 {func_name} 过长 ({func_lines} 行)")
-            
-            # 检查类长度
-            classes = re.findall(r"class\s+\w+[^:]*:", content)
-            for cls in classes:
-                cls_name = re.search(r"class\s+(\w+)", cls).group(1)
-                # 简单估算类长度
-                cls_start = content.find(cls)
-                next_cls = content.find("class ", cls_start + 1)
-                if next_cls == -1:
-                    next_cls = len(content)
-                cls_content = content[cls_start:next_cls]
-                cls_lines = cls_content.count("\n")
-                if cls_lines > 200:
-                    messages.append(f"警告: {py_file} 中的类 {cls_name} 过长 ({cls_lines} 行)")
-        
+
         # 检查JavaScript/TypeScript文件
-        js_files = [f for f in os.listdir(component_path) if (f.endswith(".js") or f.endswith(".ts")) and os.path.isfile(os.path.join(component_path, f))]
+        js_files = [f for f in dir_files if f.endswith(".js") or f.endswith(".ts")]
         js_files.extend([f for f in files if f.endswith(".js") or f.endswith(".ts")])
-        
-        for js_file in js_files:
-            if js_file in files:
-                content = files[js_file].decode("utf-8")
+
+        tasks = [(name, "py") for name in python_files] + [(name, "js") for name in js_files]
+
+        def check_file(task: Tuple[str, str]) -> Tuple[bool, List[str]]:
+            file_name, kind = task
+            if file_name in files:
+                content = files[file_name].decode("utf-8")
             else:
                 try:
-                    with open(os.path.join(component_path, js_file), "r", encoding="utf-8") as f:
-                        content = f.read()
+                    content = (component_dir / file_name).read_text(encoding="utf-8")
                 except Exception as e:
-                    is_valid = False
-                    messages.append(f"读取文件 {js_file} 时出错: {str(e)}")
-                    continue
-            
-            # 检查行长度
-            lines = content.split("\n")
-            for i, line in enumerate(lines):
-                if len(line.strip()) > 100:
-                    messages.append(f"警告: {js_file}:{i+1} 行过长 ({len(line)} > 100)")
-            
-            # 检查函数长度
-            functions = re.findall(r"function\s+\w+\([^)]*\)", content)
-            functions.extend(re.findall(r"const\s+\w+\s*=\s*\([^)]*\)\s*=>", content))
-            for func in functions:
-                func_name = re.search(r"(function|const)\s+(\w+)", func).group(2)
-                # 简单估算函数长度
-                func_start = content.find(func)
-                next_func = content.find("function ", func_start + 1)
-                if next_func == -1:
-                    next_func = content.find("const ", func_start + 1)
-                if next_func == -1:
-                    next_func = len(content)
-                func_content = content[func_start:next_func]
-                func_lines = func_content.count("\n")
-                if func_lines > 50:
-                    messages.append(f"警告: {js_file} 中的函数 {func_name} 过长 ({func_lines} 行)")
-        
+                    return False, [f"读取文件 {file_name} 时出错: {str(e)}"]
+            if kind == "py":
+                return True, self._check_python_quality(file_name, content)
+            return True, self._check_js_quality(file_name, content)
+
+        # 各文件的检查相互独立（I/O加正则扫描），文件多时用线程池并行；
+        # 少量文件直接串行，避免线程池的固定开销
+        if len(tasks) < self._PARALLEL_FILE_THRESHOLD:
+            results = [check_file(task) for task in tasks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 4)) as executor:
+                results = list(executor.map(check_file, tasks))
+
+        for file_ok, file_messages in results:
+            if not file_ok:
+                is_valid = False
+            messages.extend(file_messages)
+
         return is_valid, messages
+
+    # 文件数达到该阈值才启用线程池并行检查
+    _PARALLEL_FILE_THRESHOLD = 4
+
+    def _check_python_quality(self, py_file: str, content: str) -> List[str]:
+        """对单个Python文件做代码质量检查，返回警告消息列表"""
+        messages = []
+
+        # 检查行长度（先按原始长度粗筛，大多数行免去strip的开销）
+        for i, line in enumerate(content.split("\n")):
+            if len(line) > 100 and len(line.strip()) > 100:
+                messages.append(f"警告: {py_file}:{i+1} 行过长 ({len(line)} > 100)")
+
+        # 检查函数长度：finditer一遍拿到全部起点，相邻起点之间数换行，
+        # 替换掉此前逐函数content.find的二次扫描
+        def_matches = list(_PY_DEF_RE.finditer(content))
+        for i, match in enumerate(def_matches):
+            end = def_matches[i + 1].start() if i + 1 < len(def_matches) else len(content)
+            func_lines = content.count("\n", match.start(), end)
+            if func_lines > 50:
+                messages.append(f"警告: {py_file} 中的函数 {match.group(1)} 过长 ({func_lines} 行)")
+
+        # 检查类长度（同上）
+        class_matches = list(_PY_CLASS_RE.finditer(content))
+        for i, match in enumerate(class_matches):
+            end = class_matches[i + 1].start() if i + 1 < len(class_matches) else len(content)
+            cls_lines = content.count("\n", match.start(), end)
+            if cls_lines > 200:
+                messages.append(f"警告: {py_file} 中的类 {match.group(1)} 过长 ({cls_lines} 行)")
+
+        return messages
+
+    def _check_js_quality(self, js_file: str, content: str) -> List[str]:
+        """对单个JavaScript/TypeScript文件做代码质量检查，返回警告消息列表"""
+        messages = []
+
+        # 检查行长度（先按原始长度粗筛，大多数行免去strip的开销）
+        for i, line in enumerate(content.split("\n")):
+            if len(line) > 100 and len(line.strip()) > 100:
+                messages.append(f"警告: {js_file}:{i+1} 行过长 ({len(line)} > 100)")
+
+        # 检查函数长度：function声明和箭头函数在一个交替模式里单遍匹配
+        func_matches = list(_JS_FUNC_RE.finditer(content))
+        for i, match in enumerate(func_matches):
+            end = func_matches[i + 1].start() if i + 1 < len(func_matches) else len(content)
+            func_lines = content.count("\n", match.start(), end)
+            if func_lines > 50:
+                func_name = match.group(1) or match.group(2)
+                messages.append(f"警告: {js_file} 中的函数 {func_name} 过长 ({func_lines} 行)")
+
+        return messages
     
-    def _validate_documentation(self, component_path: str, files: Dict[str, Any]) -> Tuple[bool, List[str]]:
+    def _validate_documentation(self, component_path: str, files: Dict[str, Any],
+                                dir_files: Optional[List[str]] = None,
+                                fast: bool = False) -> Tuple[bool, List[str]]:
         """
         验证文档
-        
+
         Args:
             component_path: 组件目录路径
             files: 组件文件
-            
+            dir_files: 组件目录的文件名快照（缺省时自行扫描）
+            fast: 为True时做完README存在性检查即返回，
+                跳过只产生警告的内容检查和逐文件文档覆盖率扫描
+
         Returns:
             Tuple[bool, List[str]]: (是否通过验证, 验证消息列表)
         """
         messages = []
         is_valid = True
-        
-        # 检查README.md
-        readme_path = os.path.join(component_path, "README.md")
-        if readme_path in files:
+
+        if dir_files is None:
+            dir_files = self._list_component_files(component_path)
+
+        component_dir = Path(component_path)
+
+        # 快速模式只判定README存在与否，README内容质量和
+        # 文档覆盖率都只产生警告，调用方不看就不算
+        if fast:
+            if "README.md" in files or "README.md" in dir_files:
+                return True, []
+            return False, ["缺少README.md文件"]
+
+        # 检查README.md：files以相对文件名为键，先前用绝对路径查找
+        # 永远落空，上传内容里的README走不到内存快路径
+        if "README.md" in files:
             readme_content = files["README.md"].decode("utf-8")
-        elif os.path.exists(readme_path):
+        elif "README.md" in dir_files:
             try:
-                with open(readme_path, "r", encoding="utf-8") as f:
-                    readme_content = f.read()
+                readme_content = (component_dir / "README.md").read_text(encoding="utf-8")
             except Exception as e:
                 is_valid = False
                 messages.append(f"读取README.md时出错: {str(e)}")
@@ -299,11 +357,11 @@ class ValidationService:
         # 检查README内容
         if readme_content:
             # 检查标题
-            if not re.search(r"^#\s+\w+", readme_content, re.MULTILINE):
+            if not _MD_TITLE_RE.search(readme_content):
                 messages.append("警告: README.md缺少标题")
-                
+
             # 检查章节
-            if not re.search(r"^##\s+\w+", readme_content, re.MULTILINE):
+            if not _MD_SECTION_RE.search(readme_content):
                 messages.append("警告: README.md缺少章节标题")
                 
             # 检查长度
@@ -311,7 +369,7 @@ class ValidationService:
                 messages.append("警告: README.md内容过短")
         
         # 检查代码文档
-        python_files = [f for f in os.listdir(component_path) if f.endswith(".py") and os.path.isfile(os.path.join(component_path, f))]
+        python_files = [f for f in dir_files if f.endswith(".py")]
         python_files.extend([f for f in files if f.endswith(".py")])
         
         for py_file in python_files:
@@ -319,25 +377,23 @@ class ValidationService:
                 content = files[py_file].decode("utf-8")
             else:
                 try:
-                    with open(os.path.join(component_path, py_file), "r", encoding="utf-8") as f:
-                        content = f.read()
-                except Exception as e:
+                    content = (component_dir / py_file).read_text(encoding="utf-8")
+                except Exception:
                     continue
             
             # 检查模块文档
-            if not re.search(r'"""[^"]+"""', content):
+            if not _MODULE_DOC_RE.search(content):
                 messages.append(f"警告: {py_file} 缺少模块级文档字符串")
-            
-            # 检查函数文档
-            functions = re.findall(r"def\s+\w+\([^)]*\):", content)
-            total_funcs = len(functions)
+
+            # 检查函数文档：finditer单遍定位def，原地匹配下一行是否为
+            # 文档字符串，不再对剩余内容整段strip复制
+            def_matches = list(_PY_DEF_RE.finditer(content))
+            total_funcs = len(def_matches)
             documented_funcs = 0
-            
-            for func in functions:
-                func_name = re.search(r"def\s+(\w+)", func).group(1)
-                func_start = content.find(func)
-                next_line_start = content.find("\n", func_start) + 1
-                if next_line_start < len(content) and content[next_line_start:].strip().startswith('"""'):
+
+            for match in def_matches:
+                newline_pos = content.find("\n", match.end())
+                if newline_pos != -1 and _DOCSTRING_AT_RE.match(content, newline_pos + 1):
                     documented_funcs += 1
             
             if total_funcs > 0:
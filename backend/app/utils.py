@@ -1,24 +1,65 @@
+from functools import lru_cache
+from itertools import islice
 from math import ceil
-from typing import List, TypeVar
+from typing import Iterable, List, Optional, TypeVar
 from backend.app.schemas.params import Page, Params
 
 T = TypeVar("T")
 
 
-def paginate(items: List[T], params: Params) -> Page[T]:
+@lru_cache(maxsize=1024)
+def _page_count(total: int, size: int) -> int:
+    """计算总页数，常见的(total, size)组合直接命中缓存"""
+    return ceil(total / size) if total > 0 else 1
+
+
+def paginate(items: Iterable[T], params: Params, total: Optional[int] = None) -> Page[T]:
     """
     对项目列表进行分页
+
+    items可以是任意可迭代对象：带__len__的序列直接O(1)切片；
+    生成器等流式输入配合显式的total参数用islice只物化当前页，
+    不必先把全部数据收进内存。
     """
     start = (params.page - 1) * params.size
     end = start + params.size
-    total = len(items)
-    
-    paginated_items = items[start:end]
-    
-    return Page(
+
+    if hasattr(items, "__len__"):
+        if total is None:
+            total = len(items)
+        paginated_items = items[start:end]
+    elif total is not None:
+        paginated_items = list(islice(items, start, end))
+    else:
+        # 流式输入又没有给出总数时只能物化一次
+        items = list(items)
+        total = len(items)
+        paginated_items = items[start:end]
+
+    # 数据来自内部、字段类型可信，model_construct跳过逐字段校验
+    return Page.model_construct(
         items=paginated_items,
         total=total,
         page=params.page,
         size=params.size,
-        pages=ceil(total / params.size) if total > 0 else 1
-    ) 
\ No newline at end of file
+        pages=_page_count(total, params.size)
+    )
+
+
+def paginate_fast(items: List[T], params: Params) -> dict:
+    """
+    对项目列表进行分页，返回普通字典
+
+    读多写少的列表接口用它省掉Page泛型模型的实例化开销；
+    路由上仍声明response_model=Page[...]，文档和响应校验不受影响。
+    """
+    start = (params.page - 1) * params.size
+    total = len(items)
+
+    return {
+        "items": items[start:start + params.size],
+        "total": total,
+        "page": params.page,
+        "size": params.size,
+        "pages": _page_count(total, params.size),
+    }
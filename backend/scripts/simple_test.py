@@ -5,8 +5,17 @@
 """
 
 import os
+import re
 import tempfile
 
+# 变量占位符正则编译一次；单遍sub替换逐键replace的多遍扫描
+_VAR_RE = re.compile(r"\{\{\s*([\w.]+)\s*\}\}")
+
+
+def _replace_variables(content, data):
+    """单遍替换{{key}}占位符，未知变量原样保留"""
+    return _VAR_RE.sub(lambda m: str(data.get(m.group(1), m.group(0))), content)
+
 
 class ReportSection:
     """报告部分类"""
@@ -69,22 +78,14 @@ def generate_markdown_report(template, data):
             f.write(f"## {section.title}\n\n")
             
             # 替换数据变量
-            content = section.content
-            for key, value in data.items():
-                content = content.replace(f"{{{{{key}}}}}", str(value))
-            
-            f.write(f"{content}\n\n")
-            
+            f.write(f"{_replace_variables(section.content, data)}\n\n")
+
             # 写入子部分
             for subsection in section.subsections:
                 f.write(f"### {subsection.title}\n\n")
-                
+
                 # 替换数据变量
-                subcontent = subsection.content
-                for key, value in data.items():
-                    subcontent = subcontent.replace(f"{{{{{key}}}}}", str(value))
-                
-                f.write(f"{subcontent}\n\n")
+                f.write(f"{_replace_variables(subsection.content, data)}\n\n")
     
     return temp_file
 